@@ -1,23 +1,27 @@
 from PIL import Image
+import numpy as np
 import math
 
 def file_to_image(input_file, output_png):
     with open(input_file, "rb") as f:
         data = f.read()
 
-    bits = []
-    for byte in data:
-        for i in range(8):
-            bits.append((byte >> (7 - i)) & 1)
+    total_bits = len(data) * 8
+    side = 1 + math.isqrt(total_bits - 1) if total_bits else 0
 
-    total_bits = len(bits)
-    side = math.ceil(math.sqrt(total_bits))
+    if side % 8 == 0:
+        # Rows are whole bytes, so the file bytes already are the packed image
+        packed = data + bytes(side * side // 8 - len(data))
+    else:
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+        bits = np.pad(bits, (0, side * side - total_bits))
 
-    bits += [0] * (side * side - total_bits)
+        # Mode "1" rows are padded to whole bytes, so pack row by row
+        packed = np.packbits(bits.reshape(side, side), axis=1).tobytes()
 
-    img = Image.new("1", (side, side))
-    img.putdata(bits)
-    img.save(output_png)
+    img = Image.frombytes("1", (side, side), packed)
+    # The bits are file data, which zlib can rarely shrink; store them as is
+    img.save(output_png, compress_level=0)
 
     print(f"Saved {output_png}, size: {side}×{side} pixels")
 
@@ -26,4 +30,3 @@ if __name__ == "__main__":
     file = input("Enter file path: ")
     out = input("Enter output PNG name: ")
     file_to_image(file, out)
-
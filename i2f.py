@@ -1,21 +1,23 @@
 from PIL import Image
+import numpy as np
 
 def image_to_file(input_png, output_file):
     img = Image.open(input_png).convert("1")
-    raw_bits = list(img.getdata())
 
-    # Convert 255 -> 1 and 0 -> 0
-    bits = [1 if b > 0 else 0 for b in raw_bits]
+    packed = img.tobytes()
 
-    data = bytearray()
-    for i in range(0, len(bits), 8):
-        byte_bits = bits[i:i+8]
-        if len(byte_bits) < 8:
-            break
-        byte = 0
-        for b in byte_bits:
-            byte = (byte << 1) | b
-        data.append(byte)
+    if img.width % 8 == 0:
+        # Rows are whole bytes, so the packed image already is the file data
+        data = packed
+    else:
+        # Each row is padded to a whole byte; unpack and drop those pad bits
+        rows = np.frombuffer(packed, dtype=np.uint8).reshape(img.height, -1)
+        bits = np.unpackbits(rows, axis=1, count=img.width).ravel()
+
+        # Drop any trailing partial byte
+        bits = bits[:bits.size - bits.size % 8]
+
+        data = np.packbits(bits).tobytes()
 
     with open(output_file, "wb") as f:
         f.write(data)
@@ -27,4 +29,3 @@ if __name__ == "__main__":
     inp = input("Enter PNG file: ")
     out = input("Enter output file: ")
     image_to_file(inp, out)
-